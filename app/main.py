@@ -7,14 +7,32 @@ HTML-разметка вместо Markdown — так корректнее ра
 
 import asyncio
 import html
+import logging
 import os
 import re
-from typing import List
+from functools import lru_cache
+from itertools import islice
+from typing import (
+    Any,
+    Coroutine,
+    Dict,
+    Iterable,
+    List,
+    Match,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
 
+import orjson
 from aiogram import Bot, Dispatcher, F
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
-from aiogram.filters import Command
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, Filter
 from aiogram.types import (
     CallbackQuery,
     InlineKeyboardMarkup,
@@ -22,30 +40,83 @@ from aiogram.types import (
     Message,
 )
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from dotenv import load_dotenv
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
 
 from . import content
+from .ratelimit import RateLimiter, RateLimitMiddleware
 from .storage import PhotoStore
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# uvloop ставим до создания любого event loop — иначе он ни на что не влияет
+try:
+    import uvloop  # type: ignore
+except ImportError:
+    pass
+else:
+    uvloop.install()
+
+# На Render переменные уже в окружении — .env нужен только при локальном запуске
+if not os.getenv("BOT_TOKEN"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 ADMIN_USERNAMES = {
     u.strip().lower() for u in os.getenv("ADMIN_USERNAMES", "").split(",") if u.strip()
 }
 STORAGE_PATH = os.getenv("STORAGE_PATH", "/data/bot.db")
+# Публичный адрес сервиса для webhook; если не задан — работаем через long polling
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "").rstrip("/")
+WEBHOOK_PATH = "/tg"
+# Telegram присылает его в X-Telegram-Bot-Api-Secret-Token — чужие запросы отбрасываем
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+PORT = int(os.getenv("PORT", "8080"))
 
 if not BOT_TOKEN:
     raise RuntimeError("BOT_TOKEN is not set")
 
+
+def orjson_dumps(obj: Any) -> str:
+    return orjson.dumps(obj).decode()
+
+
+# JSON апдейтов и запросов к Bot API разбираем/собираем через orjson — он на C
+session = AiohttpSession(json_loads=orjson.loads, json_dumps=orjson_dumps)
 # ВАЖНО: используем HTML как parse_mode по умолчанию
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+bot = Bot(
+    token=BOT_TOKEN,
+    session=session,
+    default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+)
+# Все исходящие запросы идут через общий лимит — при наплыве не ловим 429 от Telegram
+bot.session.middleware(RateLimitMiddleware(RateLimiter(rate=28, per=1.0)))
 dp = Dispatcher()
 store = PhotoStore(STORAGE_PATH)
 
+_SEARCH_RE = re.compile(r"^\s*поиск\s+(.+)$", re.I)
+_PHOTO_RE = re.compile(r"^/photo\s+([a-z0-9\-]+)$")
+# Проверяется на уже очищенном и приведённом к нижнему регистру тексте
+_SAFE_FREEFORM_RE = re.compile(r"[а-яa-z0-9 _\-]{1,32}")
+
 
 # ---------- UI helpers ----------
 
+# То же, что html.escape(s, quote=True), но за один проход str.translate
+_HTML_ESCAPE_TABLE = str.maketrans(
+    {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"}
+)
+
+
+def _esc(s: str) -> str:
+    # Имена и подписи почти никогда не содержат спецсимволов — тогда строку не копируем
+    if "&" in s or "<" in s or ">" in s or '"' in s or "'" in s:
+        return s.translate(_HTML_ESCAPE_TABLE)
+    return s
+
+
 def main_menu_kb() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
     kb.button(text="👥 Люди", callback_data="menu:people")
@@ -59,13 +130,38 @@ def main_menu_kb() -> InlineKeyboardMarkup:
 
 def people_list_kb() -> InlineKeyboardMarkup:
     kb = InlineKeyboardBuilder()
-    for slug, name, *_ in content.PEOPLE:
+    for slug, name in PEOPLE_SLUG_NAME:
+        kb.button(text=name, callback_data=f"person:{slug}")
+    kb.button(text="⬅️ В меню", callback_data="menu:home")
+    kb.adjust(1)
+    return kb.as_markup()
+
+
+# Ключ — кортеж результатов search_people; одинаковые выдачи получают одну и ту же клавиатуру
+@lru_cache(maxsize=256)
+def search_results_kb(hits: Tuple[Tuple[str, str], ...]) -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    for slug, name in hits:
         kb.button(text=name, callback_data=f"person:{slug}")
     kb.button(text="⬅️ В меню", callback_data="menu:home")
     kb.adjust(1)
     return kb.as_markup()
 
 
+def back_to_menu_kb() -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    kb.button(text="⬅️ В меню", callback_data="menu:home")
+    return kb.as_markup()
+
+
+def card_nav_kb() -> InlineKeyboardMarkup:
+    kb = InlineKeyboardBuilder()
+    kb.button(text="⬅️ Люди", callback_data="menu:people")
+    kb.button(text="🏠 В меню", callback_data="menu:home")
+    kb.adjust(2)
+    return kb.as_markup()
+
+
 def person_card_caption(
     name: str, title: str, desc: str, team: str, leader: str, tg_user: str
 ) -> str:
@@ -73,209 +169,324 @@ def person_card_caption(
     HTML-подписка к карточке сотрудника.
     Все пользовательские строки экранируем для безопасности.
     """
-    esc = html.escape
-    parts = [
-        f"<b>{esc(name)}</b>",
-        f"<i>{esc(title)}</i>",
-        "",
-        esc(desc),
-        "",
-        f"<b>Команда:</b> {esc(team)}",
-        f"<b>Руководитель:</b> {esc(leader)}",
-        "",
-        f'<a href="https://t.me/{tg_user}">Написать в Telegram</a>',
-    ]
-    return "\n".join(parts)
+    return (
+        f"<b>{_esc(name)}</b>\n"
+        f"<i>{_esc(title)}</i>\n"
+        "\n"
+        f"{_esc(desc)}\n"
+        "\n"
+        f"<b>Команда:</b> {_esc(team)}\n"
+        f"<b>Руководитель:</b> {_esc(leader)}\n"
+        "\n"
+        f'<a href="https://t.me/{tg_user}">Написать в Telegram</a>'
+    )
 
 
 def faq_text() -> str:
-    rows = ["<b>FAQ</b>"]
-    for q, label, url in content.FAQ:
-        rows.append(f"• <b>{html.escape(q)}</b>\n  👉 <a href=\"{url}\">{html.escape(label)}</a>")
-    return "\n\n".join(rows)
+    return "<b>FAQ</b>\n\n" + "\n\n".join(
+        f"• <b>{_esc(q)}</b>\n  👉 <a href=\"{url}\">{_esc(label)}</a>"
+        for q, label, url in content.FAQ
+    )
 
 
 def materials_text() -> str:
-    rows = ["> всё, что чаще всего ищут (и спрашивают у нас в панике 🔥):"]
-    for label, url in content.MATERIALS:
-        rows.append(f"• <a href=\"{url}\">{html.escape(label)}</a>")
-    return "\n".join(rows)
+    return "> всё, что чаще всего ищут (и спрашивают у нас в панике 🔥):\n" + "\n".join(
+        f"• <a href=\"{url}\">{_esc(label)}</a>" for label, url in content.MATERIALS
+    )
 
 
 def tasking_text() -> str:
-    return html.escape(content.TASKING_TEXT)
+    return _esc(content.TASKING_TEXT)
+
+
+# Поисковый индекс собираем один раз при старте — PEOPLE в рантайме не меняется.
+# Строка: (slug, имя для кнопки, все поля карточки одной строкой в нижнем регистре)
+PEOPLE_INDEX: List[Tuple[str, str, str]] = [
+    (p[0], p[1], " ".join(p[1:]).lower()) for p in content.PEOPLE
+]
+PEOPLE_SLUG_NAME: List[Tuple[str, str]] = [(slug, name) for slug, name, _ in PEOPLE_INDEX]
+
+
+def search_people(query: str) -> Tuple[Tuple[str, str], ...]:
+    return _search_people(query.strip().lower())
+
+
+# Индекс неизменен, поэтому результат зависит только от нормализованного запроса
+@lru_cache(maxsize=256)
+def _search_people(q: str) -> Tuple[Tuple[str, str], ...]:
+    # `in` по готовым строкам — поиск целиком на C; односимвольный запрос уходит в memchr
+    return tuple(islice(((slug, name) for slug, name, hay in PEOPLE_INDEX if q in hay), 20))
+
+
+def minimal_keywords(keys: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Ключи по возрастанию длины, без тех, что содержат более короткий ключ
+    («гайдбук» ⊃ «гайд»): для проверки `k in text` они ничего не добавляют.
+    """
+    result: List[str] = []
+    for key in sorted(keys, key=lambda k: (len(k), k)):
+        if not any(short in key for short in result):
+            result.append(key)
+    return tuple(result)
+
+
+# Раскладка кнопок: (подпись, callback_data) по рядам — без приватных полей aiogram
+Layout = Tuple[Tuple[Tuple[str, Optional[str]], ...], ...]
 
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+
+
+def keyboard_layout(markup: InlineKeyboardMarkup) -> Layout:
+    return tuple(
+        tuple((b.text, b.callback_data) for b in row) for row in markup.inline_keyboard
+    )
+
+
+class Screen(NamedTuple):
+    """Экран меню: что отправляем (HTML) и как он выглядит в пришедшем апдейте."""
+
+    text: str
+    markup: InlineKeyboardMarkup
+    plain: str
+    layout: Layout
+
+
+def make_screen(text: str, markup: InlineKeyboardMarkup) -> Screen:
+    plain = html.unescape(_HTML_TAG_RE.sub("", text))
+    return Screen(text, markup, plain, keyboard_layout(markup))
+
+
+def keyword_pattern(keys: Iterable[str]) -> Pattern[str]:
+    """Один проход регэкспа по тексту вместо отдельного `in` на каждый ключ."""
+    return re.compile("|".join(map(re.escape, minimal_keywords(keys))))
+
+
+# Статичные экраны не меняются после старта — собираем их один раз
+START_MESSAGE = f"<b>{_esc(content.BOT_NAME)}</b>\n\n{_esc(content.START_TEXT)}"
+MAIN_MENU_MARKUP = main_menu_kb()
+PEOPLE_LIST_MARKUP = people_list_kb()
+BACK_KB = back_to_menu_kb()
+CARD_NAV_KB = card_nav_kb()
+FAQ_TEXT = faq_text()
+MATERIALS_TEXT = materials_text()
+TASKING_TEXT = tasking_text()
+SEARCH_HINT_TEXT = (
+    "напиши мне имя, роль или ключевое слово — я найду человека. "
+    "Формат: <code>поиск &lt;запрос&gt;</code>"
+)
+HOME_SCREEN = make_screen(START_MESSAGE, MAIN_MENU_MARKUP)
+PEOPLE_SCREEN = make_screen("выбирай персонажа:", PEOPLE_LIST_MARKUP)
+MATERIALS_SCREEN = make_screen(MATERIALS_TEXT, BACK_KB)
+TASKING_SCREEN = make_screen(TASKING_TEXT, BACK_KB)
+FAQ_SCREEN = make_screen(FAQ_TEXT, BACK_KB)
+SEARCH_SCREEN = make_screen(SEARCH_HINT_TEXT, BACK_KB)
+PERSON_CAPTIONS: Dict[str, str] = {p[0]: person_card_caption(*p[1:]) for p in content.PEOPLE}
+
+# Быстрые ответы в порядке приоритета: (ответ, все ключи маршрута одним регэкспом).
+# Один regex на маршрут, а не общий на всех, — иначе победит самое левое
+# совпадение в тексте, а не маршрут с бо́льшим приоритетом.
+QUICK_ROUTES: Tuple[Tuple[str, Pattern[str]], ...] = tuple(
+    (text, keyword_pattern(content.KEYWORD_ROUTES[route]))
+    for route, text in (
+        ("materials", MATERIALS_TEXT),
+        ("tasking", TASKING_TEXT),
+        ("faq", FAQ_TEXT),
+    )
+    if content.KEYWORD_ROUTES.get(route)
+)
 
-def search_people(query: str) -> List[str]:
-    q = query.lower()
-    hits: List[str] = []
-    for slug, name, title, desc, team, leader, tg in content.PEOPLE:
-        hay = " ".join([name, title, desc, team, leader, tg]).lower()
-        if q in hay:
-            hits.append(slug)
-    return hits[:20]
 
+class IsAdmin(Filter):
+    """Пропускает только сообщения от пользователей из ADMIN_USERNAMES."""
 
-def is_admin(msg: Message) -> bool:
-    if not msg.from_user or not msg.from_user.username:
-        return False
-    return msg.from_user.username.lower() in ADMIN_USERNAMES
+    async def __call__(self, message: Message) -> bool:
+        user = message.from_user
+        return bool(user and user.username and user.username.lower() in ADMIN_USERNAMES)
 
 
 # ---------- Handlers ----------
 
+async def show_screen(callback: CallbackQuery, screen: Screen) -> None:
+    """
+    Перерисовывает сообщение с меню, если на нём сейчас другой экран.
+
+    Что показано, берём из самого callback (Telegram присылает сообщение
+    целиком), а не из локального кэша: так ответ не зависит от порядка
+    параллельных тапов и от того, какой инстанс обрабатывает апдейт.
+    Сравниваем то, что переживает разбор апдейта, — текст без разметки
+    и раскладку кнопок.
+    """
+    msg = callback.message
+    if (
+        isinstance(msg, Message)
+        and msg.text == screen.plain
+        and msg.reply_markup is not None
+        and keyboard_layout(msg.reply_markup) == screen.layout
+    ):
+        await callback.answer()
+        return
+    try:
+        await msg.edit_text(screen.text, reply_markup=screen.markup)
+    except TelegramBadRequest as e:
+        if "message is not modified" not in e.message:
+            raise
+        await callback.answer()
+
+
 @dp.message(Command("start"))
 async def cmd_start(message: Message) -> None:
-    await message.answer(
-        f"<b>{html.escape(content.BOT_NAME)}</b>\n\n{html.escape(content.START_TEXT)}",
-        reply_markup=main_menu_kb(),
-    )
+    await message.answer(START_MESSAGE, reply_markup=MAIN_MENU_MARKUP)
 
 
 @dp.callback_query(F.data == "menu:home")
 async def cb_home(callback: CallbackQuery) -> None:
-    await callback.message.edit_text(
-        f"<b>{html.escape(content.BOT_NAME)}</b>\n\n{html.escape(content.START_TEXT)}",
-        reply_markup=main_menu_kb(),
-    )
+    await show_screen(callback, HOME_SCREEN)
 
 
 @dp.callback_query(F.data == "menu:people")
 async def cb_people(callback: CallbackQuery) -> None:
-    await callback.message.edit_text("выбирай персонажа:", reply_markup=people_list_kb())
+    await show_screen(callback, PEOPLE_SCREEN)
 
 
 @dp.callback_query(F.data == "menu:materials")
 async def cb_materials(callback: CallbackQuery) -> None:
-    kb = InlineKeyboardBuilder()
-    kb.button(text="⬅️ В меню", callback_data="menu:home")
-    await callback.message.edit_text(materials_text(), reply_markup=kb.as_markup())
+    await show_screen(callback, MATERIALS_SCREEN)
 
 
 @dp.callback_query(F.data == "menu:tasking")
 async def cb_tasking(callback: CallbackQuery) -> None:
-    kb = InlineKeyboardBuilder()
-    kb.button(text="⬅️ В меню", callback_data="menu:home")
-    await callback.message.edit_text(tasking_text(), reply_markup=kb.as_markup())
+    await show_screen(callback, TASKING_SCREEN)
 
 
 @dp.callback_query(F.data == "menu:faq")
 async def cb_faq(callback: CallbackQuery) -> None:
-    kb = InlineKeyboardBuilder()
-    kb.button(text="⬅️ В меню", callback_data="menu:home")
-    await callback.message.edit_text(faq_text(), reply_markup=kb.as_markup())
+    await show_screen(callback, FAQ_SCREEN)
 
 
 @dp.callback_query(F.data == "menu:search")
 async def cb_search(callback: CallbackQuery) -> None:
-    kb = InlineKeyboardBuilder()
-    kb.button(text="⬅️ В меню", callback_data="menu:home")
-    await callback.message.edit_text(
-        "напиши мне имя, роль или ключевое слово — я найду человека. "
-        "Формат: <code>поиск &lt;запрос&gt;</code>",
-        reply_markup=kb.as_markup(),
-    )
+    await show_screen(callback, SEARCH_SCREEN)
 
 
-@dp.message(F.text.regexp(r"^\s*поиск\s+(.+)$"))
-async def text_search(message: Message) -> None:
-    query = re.findall(r"^\s*поиск\s+(.+)$", message.text, flags=re.I)[0]
-    slugs = search_people(query)
-    if not slugs:
+@dp.message(F.text.regexp(_SEARCH_RE).as_("search_match"))
+async def text_search(message: Message, search_match: Match[str]) -> None:
+    query = search_match.group(1)
+    hits = search_people(query)
+    if not hits:
         await message.answer(
             "ничего не нашла. попробуй по имени или по роли (например: «бренд», «трейд», «исследование»)."
         )
         return
-    kb = InlineKeyboardBuilder()
-    for slug in slugs:
-        name = next(p[1] for p in content.PEOPLE if p[0] == slug)
-        kb.button(text=name, callback_data=f"person:{slug}")
-    kb.button(text="⬅️ В меню", callback_data="menu:home")
-    kb.adjust(1)
-    await message.answer("нашла вот что:", reply_markup=kb.as_markup())
+    await message.answer("нашла вот что:", reply_markup=search_results_kb(hits))
 
 
 # Свободный текст — быстрые ответы на популярные слова
-@dp.message(F.text.func(lambda t: isinstance(t, str)))
+# Только текст (у фото/стикеров F.text — None). Фильтр по длине дешёво отсекает
+# одиночные символы до запуска обработчика; « ф» и «ф\n» он пропустит,
+# поэтому после strip() длину проверяем ещё раз
+@dp.message(F.text.len() >= 2)
 async def quick_replies(message: Message) -> None:
-    t = message.text.lower()
-
-    def matches(route: str) -> bool:
-        return any(key in t for key in content.KEYWORD_ROUTES.get(route, set()))
-
-    if matches("materials"):
-        await message.answer(materials_text())
+    t = message.text.strip().lower()
+    if len(t) < 2 or not any(c.isalnum() for c in t):
         return
-    if matches("tasking"):
-        await message.answer(tasking_text())
-        return
-    if matches("faq"):
-        await message.answer(faq_text())
+    reply = next((text for text, pattern in QUICK_ROUTES if pattern.search(t)), None)
+    if reply:
+        await message.answer(reply)
         return
     # если ничего не подошло — не перехватываем другие обработчики
     # но чтобы пользователь получил фидбек:
-    if re.fullmatch(r"\s*[а-яa-z0-9 _\-]{1,32}\s*", t, flags=re.I):
+    if _SAFE_FREEFORM_RE.fullmatch(t):
         await message.answer(
             "я не уверена, что поняла. Можешь написать «поиск Иван», "
             "или попробовать слова: «гайд», «брендбук», «Ева», «FAQ»."
         )
 
 
+# Готовые InputMediaPhoto для карточек с фото; сбрасываются при новой загрузке
+CARD_MEDIA: Dict[str, InputMediaPhoto] = {}
+
+
+def card_media(slug: str, file_id: str) -> InputMediaPhoto:
+    media = CARD_MEDIA.get(slug)
+    if media is None or media.media != file_id:
+        media = CARD_MEDIA[slug] = InputMediaPhoto(media=file_id, caption=PERSON_CAPTIONS[slug])
+    return media
+
+
+async def init_store() -> None:
+    await store.init()
+    for slug, file_id in (await store.get_all_file_ids()).items():
+        if slug in PERSON_CAPTIONS:
+            card_media(slug, file_id)
+
+
 @dp.callback_query(F.data.startswith("person:"))
 async def cb_person(callback: CallbackQuery) -> None:
     slug = callback.data.split(":", 1)[1]
-    person = next((p for p in content.PEOPLE if p[0] == slug), None)
-    if not person:
+    caption = PERSON_CAPTIONS.get(slug)
+    if caption is None:
         await callback.answer("карточка не найдена", show_alert=True)
         return
-    _, name, title, desc, team, leader, tg_user = person
-    caption = person_card_caption(name, title, desc, team, leader, tg_user)
-
-    kb = InlineKeyboardBuilder()
-    kb.button(text="⬅️ Люди", callback_data="menu:people")
-    kb.button(text="🏠 В меню", callback_data="menu:home")
-    kb.adjust(2)
 
     file_id = await store.get_file_id(slug)
-    if file_id:
-        try:
-            if callback.message.photo:
-                await callback.message.edit_media(
-                    InputMediaPhoto(media=file_id, caption=caption, parse_mode=ParseMode.HTML),
-                    reply_markup=kb.as_markup(),
-                )
-            else:
-                await bot.send_photo(
-                    chat_id=callback.message.chat.id,
-                    photo=file_id,
-                    caption=caption,
-                    reply_markup=kb.as_markup(),
-                    parse_mode=ParseMode.HTML,
-                )
-        except Exception:
-            await callback.message.edit_text(caption, reply_markup=kb.as_markup())
-    else:
-        await callback.message.edit_text(caption, reply_markup=kb.as_markup())
+    if not file_id:
+        await callback.message.edit_text(caption, reply_markup=CARD_NAV_KB)
+        return
+    try:
+        if callback.message.photo:
+            # InputMediaPhoto нужен только здесь, и он уже собран заранее
+            await callback.message.edit_media(card_media(slug, file_id), reply_markup=CARD_NAV_KB)
+        else:
+            await bot.send_photo(
+                chat_id=callback.message.chat.id,
+                photo=file_id,
+                caption=caption,
+                reply_markup=CARD_NAV_KB,
+            )
+    except Exception:
+        await callback.message.edit_text(caption, reply_markup=CARD_NAV_KB)
 
 
 # ---------- Admin: загрузка фото ----------
 
-@dp.message(F.photo & F.caption.regexp(r"^/photo\s+([a-z0-9\-]+)$"))
-async def admin_photo_caption(message: Message) -> None:
-    if not is_admin(message):
-        await message.reply("нужны права админа.")
+# Держим ссылки на фоновые задачи, иначе GC может собрать их на середине
+_bg_tasks: Set["asyncio.Task[None]"] = set()
+
+
+def _log_task_error(task: "asyncio.Task[None]") -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("background task failed", exc_info=task.exception())
+
+
+def spawn(coro: Coroutine[Any, Any, None]) -> None:
+    task = asyncio.create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+    task.add_done_callback(_log_task_error)
+
+
+async def _save_and_ack(slug: str, file_id: str, message: Message) -> None:
+    # Отвечаем только после того, как запись реально легла на диск
+    try:
+        await store.set_file_id(slug, file_id)
+    except Exception:
+        logger.exception("failed to save photo for %s", slug)
+        await message.reply(
+            f"⚠️ не удалось сохранить фото для <code>{_esc(slug)}</code>, попробуй ещё раз"
+        )
         return
-    slug = re.findall(r"^/photo\s+([a-z0-9\-]+)$", message.caption.strip())[0]
-    file_id = message.photo[-1].file_id
-    await store.set_file_id(slug, file_id)
-    await message.reply(f"🔐 фото сохранено для <code>{html.escape(slug)}</code>")
+    CARD_MEDIA.pop(slug, None)
+    await message.reply(f"🔐 фото сохранено для <code>{_esc(slug)}</code>")
+
+
+@dp.message(F.photo, F.caption.regexp(_PHOTO_RE).as_("photo_match"), IsAdmin())
+async def admin_photo_caption(message: Message, photo_match: Match[str]) -> None:
+    slug = photo_match.group(1)
+    spawn(_save_and_ack(slug, message.photo[-1].file_id, message))
 
 
-@dp.message(Command("photo"))
+@dp.message(Command("photo"), IsAdmin())
 async def admin_photo_help(message: Message) -> None:
-    if not is_admin(message):
-        await message.reply("нужны права админа.")
-        return
     await message.reply(
         "пришли фото с подписью <code>/photo &lt;slug&gt;</code>\n"
         "например: <code>/photo polina-tikhonenko</code>"
@@ -284,15 +495,42 @@ async def admin_photo_help(message: Message) -> None:
 
 # ---------- Run ----------
 
+dp.shutdown.register(store.close)
+
+# Все обработчики уже зарегистрированы выше — список типов апдейтов больше не изменится
+ALLOWED_UPDATES = dp.resolve_used_update_types()
+
+
 async def main() -> None:
-    await store.init()
-    try:
-        import uvloop  # type: ignore
-        uvloop.install()
-    except Exception:
-        pass
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    await init_store()
+    # Если раньше работали через webhook, он остался у Telegram и getUpdates
+    # будет падать с 409 Conflict — снимаем его перед polling
+    await bot.delete_webhook()
+    await dp.start_polling(bot, allowed_updates=ALLOWED_UPDATES)
+
+
+async def on_webhook_startup(bot: Bot) -> None:
+    await init_store()
+    await bot.set_webhook(
+        f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+        allowed_updates=ALLOWED_UPDATES,
+        secret_token=WEBHOOK_SECRET,
+    )
+
+
+def run_webhook() -> None:
+    """Telegram сам присылает апдейты на WEBHOOK_PATH — без циклов getUpdates."""
+    dp.startup.register(on_webhook_startup)
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dp, bot=bot, handle_in_background=True, secret_token=WEBHOOK_SECRET
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    web.run_app(app, host="0.0.0.0", port=PORT)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if WEBHOOK_URL:
+        run_webhook()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Outbound rate limiting for Bot API calls.
+
+Telegram allows a bot roughly 30 messages per second. Rather than wrapping
+every handler call, RateLimitMiddleware is attached to the bot session, so
+each request (edit_text, send_photo, answer, ...) passes through a shared
+RateLimiter first. Flood-control errors are retried after the delay that
+Telegram asks for.
+"""
+
+import asyncio
+from collections import deque
+from typing import TYPE_CHECKING, Deque
+
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+
+class RateLimiter:
+    """Async context manager allowing at most `rate` entries per `per` seconds."""
+
+    def __init__(self, rate: int = 28, per: float = 1.0):
+        self.rate = rate
+        self.per = per
+        # Start times of the last `rate` entries, oldest first
+        self._starts: Deque[float] = deque(maxlen=rate)
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            if len(self._starts) == self.rate:
+                delay = self._starts[0] + self.per - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._starts.append(loop.time())
+
+    async def __aexit__(self, *exc: object) -> None:
+        return None
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """Session middleware that throttles requests and retries on flood control."""
+
+    def __init__(self, limiter: RateLimiter, max_retries: int = 2):
+        self.limiter = limiter
+        self.max_retries = max_retries
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: "Bot",
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        retries = 0
+        while True:
+            async with self.limiter:
+                try:
+                    return await make_request(bot, method)
+                except TelegramRetryAfter as e:
+                    retries += 1
+                    if retries > self.max_retries:
+                        raise
+                    retry_after = e.retry_after
+            await asyncio.sleep(retry_after)
@@ -6,8 +6,22 @@ file_id values returned by Telegram when photos are uploaded. This
 avoids re-uploading images every time they are sent.
 """
 
+import asyncio
+import logging
+from contextlib import suppress
+from typing import Dict, List, Optional, Tuple
+
 import aiosqlite
-from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How long the writer waits for more uploads before committing a batch
+FLUSH_DELAY = 0.05
+
+UPSERT_SQL = """
+INSERT INTO photos(slug, file_id) VALUES(?, ?)
+ON CONFLICT(slug) DO UPDATE SET file_id=excluded.file_id
+"""
 
 
 class PhotoStore:
@@ -15,35 +29,95 @@ class PhotoStore:
 
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        # Full in-memory copy of the photos table, loaded once in init()
+        self._map: Dict[str, str] = {}
+        # (slug, file_id, future resolved once the row is committed)
+        self._write_q: "asyncio.Queue[Tuple[str, str, asyncio.Future[None]]]" = asyncio.Queue()
+        self._writer: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def db(self) -> aiosqlite.Connection:
+        if self._db is None:
+            raise RuntimeError("PhotoStore.init() has not been called")
+        return self._db
 
     async def init(self) -> None:
-        """Initialise the database, creating the table if it doesn't exist."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS photos (
-                    slug TEXT PRIMARY KEY,
-                    file_id TEXT NOT NULL
-                )
-                """
+        """Open the long-lived connection and create the table if it doesn't exist."""
+        self._db = await aiosqlite.connect(self.db_path)
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.execute("PRAGMA synchronous=NORMAL")
+        await self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS photos (
+                slug TEXT PRIMARY KEY,
+                file_id TEXT NOT NULL
             )
-            await db.commit()
+            """
+        )
+        await self._db.commit()
+        async with self._db.execute("SELECT slug, file_id FROM photos") as cur:
+            self._map = {slug: file_id async for slug, file_id in cur}
+        self._writer = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        """Flush pending writes and close the connection opened by init()."""
+        if self._writer is not None:
+            await self._write_q.join()
+            self._writer.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer
+            self._writer = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
 
     async def set_file_id(self, slug: str, file_id: str) -> None:
-        """Insert or update the file_id for a given slug."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                INSERT INTO photos(slug, file_id) VALUES(?, ?) 
-                ON CONFLICT(slug) DO UPDATE SET file_id=excluded.file_id
-                """,
-                (slug, file_id),
-            )
-            await db.commit()
+        """
+        Insert or update the file_id for a given slug.
+
+        The write is queued and committed together with any uploads that
+        follow within FLUSH_DELAY seconds. Returns once the row is on disk
+        (and visible to readers); raises if the commit failed.
+        """
+        if self._writer is None or self._writer.done():
+            # Nobody would ever resolve the future below — fail instead of hanging
+            raise RuntimeError("PhotoStore is not running (init() not called or already closed)")
+        done: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        await self._write_q.put((slug, file_id, done))
+        await done
+
+    async def _write_loop(self) -> None:
+        """Drain the write queue, committing each batch in one transaction."""
+        while True:
+            batch: List[Tuple[str, str, "asyncio.Future[None]"]] = [await self._write_q.get()]
+            await asyncio.sleep(FLUSH_DELAY)
+            while not self._write_q.empty():
+                batch.append(self._write_q.get_nowait())
+            try:
+                rows = [(slug, file_id) for slug, file_id, _ in batch]
+                await self.db.executemany(UPSERT_SQL, rows)
+                await self.db.commit()
+            except Exception as e:
+                logger.exception("failed to persist %d photo file_id(s)", len(batch))
+                with suppress(Exception):
+                    await self.db.rollback()
+                for _, _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+            else:
+                for slug, file_id, done in batch:
+                    self._map[slug] = file_id
+                    if not done.done():
+                        done.set_result(None)
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
 
     async def get_file_id(self, slug: str) -> Optional[str]:
         """Retrieve the cached file_id for a given slug, if present."""
-        async with aiosqlite.connect(self.db_path) as db:
-            async with db.execute("SELECT file_id FROM photos WHERE slug=?", (slug,)) as cur:
-                row = await cur.fetchone()
-                return row[0] if row else None
\ No newline at end of file
+        return self._map.get(slug)
+
+    async def get_all_file_ids(self) -> Dict[str, str]:
+        """Return a copy of every stored slug → file_id mapping."""
+        return dict(self._map)